@@ -14,7 +14,7 @@ from .character import Character
 from .exceptions import AgentPanic, AgentFinished, AgentChangeStrategy
 from .exploration_logic import ExplorationLogic
 from .global_logic import GlobalLogic
-from .glyph import MON, C, Hunger, G, SHOP
+from .glyph import MON, C, Hunger, G, SHOP, glyph_lut
 from .item import Item, flatten_items
 from .item.inventory import Inventory
 from .level import Level
@@ -25,8 +25,29 @@ from .strategy import Strategy
 BLStats = namedtuple('BLStats',
                      'x y strength_percentage strength dexterity constitution intelligence wisdom charisma score hitpoints max_hitpoints depth gold energy max_energy armor_class monster_level experience_level experience_points time hunger_state carrying_capacity dungeon_number level_number prop_mask')
 
+# monsters that `Agent.bfs` doesn't walk through
+_ONLY_RANGED_SLOW_MONSTERS = frozenset(MON.fn(name) for name in combat.monster_utils.ONLY_RANGED_SLOW_MONSTERS)
+
 
 class Agent:
+    # bits of `Agent.glyph_flags`
+    WALKABLE_GLYPH = 1
+    OCCUPIED_GLYPH = 2
+    OBSTACLE_GLYPH = 4
+    MON_GLYPH = 8
+    PET_GLYPH = 16
+    INVISIBLE_MON_GLYPH = 32
+    SWALLOW_GLYPH = 64
+    BOULDER_GLYPH = 128
+    STONE_GLYPH = 256
+    DOOR_CLOSED_GLYPH = 512
+    SHOPKEEPER_GLYPH = 1024
+    OBJECT_GLYPH = 2048
+    VISIBLE_FLOOR_GLYPH = 4096
+    RANGED_SLOW_MON_GLYPH = 8192
+    ORACLE_GLYPH = 16384
+    GUARD_GLYPH = 32768
+
     def __init__(self, env, seed=0, verbose=False, panic_on_errors=False,
                  rl_model_to_train=None, rl_model_training_comm=(None, None)):
         self.env = env
@@ -39,9 +60,11 @@ class Agent:
 
         self.on_update = []
         self.levels = {}
+        self._current_level = None  # cached `self.levels` entry for the current blstats, see `current_level`
         self.score = 0
         self.step_count = 0
         self._observation = None  # this should be used in additional_action_iterator generators
+        self._tty_bytes = None  # `tty_chars` of `_observation` as bytes
         # single_{message,popup} should be used in additional_action_itertator generators.
         # (non-single) message & popup contain cummulated content
         self.message = self.single_message = ''
@@ -58,8 +81,11 @@ class Agent:
         self.global_logic = GlobalLogic(self)
         self.monster_tracker = MonsterTracker(self)
 
-        self.last_bfs_dis = None
-        self.last_bfs_step = None
+        # BFS results valid for a single step, see `bfs`
+        self._bfs_cache_key = None
+        self._bfs_cache = {}  # {(y, x) -> dis}
+        self._bfs_walkable = None
+        self._bfs_queue = np.empty((2, C.SIZE_Y * C.SIZE_X), dtype=np.int32)  # scratch buffer for `utils.bfs`
         self.last_prayer_turn = None
         self._previous_glyphs = None
         self._last_turn = -1
@@ -279,8 +305,11 @@ class Agent:
         """ Return (line, column) of markers:
         --More-- | (end) | (X of N)
         """
-        if len(regex.findall(' '.join(lines))) > 1:
+        markers_count = len(regex.findall(' '.join(lines)))
+        if markers_count > 1:
             raise ValueError('Too many markers')
+        if markers_count == 0:
+            return None, None
 
         result, marker_type = None, None
         for i, line in enumerate(lines):
@@ -309,7 +338,10 @@ class Agent:
         # assert '\n' not in message and '\r' not in message
         popup = []
 
-        lines = [bytes(line).decode().replace('\0', ' ').replace('\n', '') for line in obs['tty_chars']]
+        # decode the whole screen at once (tty characters are ASCII so the line width is preserved)
+        height, width = obs['tty_chars'].shape
+        screen = self._tty_bytes.decode().replace('\0', ' ')
+        lines = [screen[i * width: (i + 1) * width].replace('\n', '') for i in range(height)]
         marker_pos, marker_type = self._find_marker(lines)
 
         if marker_pos is None:
@@ -390,9 +422,33 @@ class Agent:
 
     def update(self, observation, additional_action_iterator=None):
         self._observation = observation
+        # shared by `get_message_and_popup` and the prompt checks in `_handle_prompt`
+        self._tty_bytes = observation['tty_chars'].tobytes()
         done = self.update_message_and_popup(observation)
 
         self._is_reading_message_or_popup = True
+        if self._handle_prompt(observation, done, additional_action_iterator):
+            # the state will be updated after the prompt is answered
+            return
+
+        self._is_reading_message_or_popup = False
+        self._message_history.append(self.message)
+
+        # should_update = True
+
+        # if self.turns_in_atom_operation is not None:
+        #     should_update = False
+        #     # if any([(self.last_observation[key] != observation[key]).any()
+        #     #         for key in ['glyphs', 'blstats', 'inv_strs', 'inv_letters', 'inv_oclasses', 'inv_glyphs']]):
+        #     #     self.turns_in_atom_operation += 1
+        #     # assert self.turns_in_atom_operation in [0, 1]
+
+        self._update_observed_state(observation)
+
+    def _handle_prompt(self, observation, done, additional_action_iterator):
+        """ Answers the prompt (or continues `additional_action_iterator`) if needed.
+        Returns True if a step was taken.
+        """
         if additional_action_iterator is not None:
             is_next_action = True
             try:
@@ -402,45 +458,35 @@ class Agent:
 
             if is_next_action:
                 self.step(next_action, additional_action_iterator)
-                return
+                return True
 
         # FIXME: self.update_state() won't be called on all states sometimes.
         #        Otherwise there are problems with atomic operations.
         if not done or observation['misc'][2]:
             self.step(A.TextCharacters.SPACE)
-            return
+            return True
 
         if observation['misc'][1]:  # entering text
             if "You may wish for an object." in self.message:
                 # TODO: wishing strategy
                 # TODO: assume wished item as blessed
                 self.step('b', iter('lessed greased +2 gray dragon scale mail\r'))
-                return
             else:
                 self.step(A.Command.ESC)
-                return
+            return True
 
         if 'Where do you want to be teleported?' in self.message:
             # TODO: teleport control
             self.step(A.Command.ESC)
-            return
+            return True
 
-        if b'[yn]' in bytes(observation['tty_chars'].reshape(-1)):
+        if b'[yn]' in self._tty_bytes:
             self.type_text('y')
-            return
-
-        self._is_reading_message_or_popup = False
-        self._message_history.append(self.message)
-
-        # should_update = True
+            return True
 
-        # if self.turns_in_atom_operation is not None:
-        #     should_update = False
-        #     # if any([(self.last_observation[key] != observation[key]).any()
-        #     #         for key in ['glyphs', 'blstats', 'inv_strs', 'inv_letters', 'inv_oclasses', 'inv_glyphs']]):
-        #     #     self.turns_in_atom_operation += 1
-        #     # assert self.turns_in_atom_operation in [0, 1]
+        return False
 
+    def _update_observed_state(self, observation):
         if self.last_observation is None:
             self.last_observation = observation
             self._previous_glyphs = self.last_observation['glyphs']
@@ -448,8 +494,15 @@ class Agent:
             self._previous_glyphs = self.last_observation['glyphs']
             self.last_observation = observation
 
-        self.blstats = BLStats(*self.last_observation['blstats'])
+        # python ints are much cheaper to operate on than numpy scalars
+        self.blstats = BLStats(*self.last_observation['blstats'].tolist())
+        if self._current_level is not None and \
+                self._current_level.key() != (self.blstats.dungeon_number, self.blstats.level_number):
+            self._current_level = None
         self.glyphs = self.last_observation['glyphs']
+        # all per-step glyph masks are derived from this single pass over `glyphs`
+        # (np.take is noticeably faster than fancy indexing for small int16 index arrays)
+        self.glyph_flags = np.take(_GLYPH_FLAGS_LUT, self.glyphs)
 
         self.stats_logger.log_cumulative_value('max_turns_on_position',
                                                key=(self.current_level().dungeon_number,
@@ -483,6 +536,7 @@ class Agent:
                     func()
                     self.message = message
                     self.popup = popup
+                self._bfs_cache_key = None
 
             if allow_callbacks:
                 self.call_update_functions()
@@ -505,7 +559,7 @@ class Agent:
         level.item_count[self.blstats.y, self.blstats.x] = len(self.inventory.items_below_me)
 
         # TODO: optimize
-        ignore_mask = utils.isin(self.glyphs, G.MONS, G.PETS)  # TODO: effects, etc
+        ignore_mask = (self.glyph_flags & (Agent.MON_GLYPH | Agent.PET_GLYPH)) != 0  # TODO: effects, etc
         item_mask = level.item_count != 0
         mask = item_mask & ~ignore_mask
         level.item_disagreement_counter[~mask] = 0
@@ -533,32 +587,33 @@ class Agent:
             shop_type = SHOP.name2id[shop_name]
 
         shopkeepers = list(
-            zip(*(utils.isin(self.glyphs, G.SHOPKEEPER) & self.monster_tracker.peaceful_monster_mask).nonzero()))
+            zip(*(((self.glyph_flags & Agent.SHOPKEEPER_GLYPH) != 0) &
+                  self.monster_tracker.peaceful_monster_mask).nonzero()))
+        if not shopkeepers:
+            return
+
+        wall_mask = (level.flags & Level.WALL) != 0
+        entry = ((utils.translate(wall_mask, 1, 0) & utils.translate(wall_mask, -1, 0)) |
+                 (utils.translate(wall_mask, 0, 1) & utils.translate(wall_mask, 0, -1))) & \
+                level.walkable
+        walkable = level.walkable & ~entry
+        not_near_entry = ~utils.dilate(entry, radius=1, with_diagonal=False)
         for y, x in shopkeepers:
-            wall_mask = utils.isin(level.objects, G.WALL)
-            entry = ((utils.translate(wall_mask, 1, 0) & utils.translate(wall_mask, -1, 0)) |
-                     (utils.translate(wall_mask, 0, 1) & utils.translate(wall_mask, 0, -1))) & \
-                    level.walkable
-            walkable = level.walkable & ~entry
             mask = utils.bfs(y, x, walkable=walkable, walkable_diagonally=walkable, can_squeeze=False) != -1
             mask = utils.dilate(mask, radius=1)
 
             level.shop[mask] = True
             if mask[self.blstats.y, self.blstats.x] and shop_type is not None:
                 level.shop_type[mask] = shop_type
-            level.shop_interior[mask & ~utils.dilate(entry, radius=1, with_diagonal=False)] = True
+            level.shop_interior[mask & not_near_entry] = True
 
     def _update_level_corpses(self):
-        mnames = list(map(lambda x: x[-1],
-                          re.findall(r'((kills?)|(destroys?)) ((an?)|(the) )?([a-zA-Z ]+)\!', self.message)))
-        mnames += list(map(lambda x: x[-4],
-                           re.findall(r'((An? )|(The )( *))([a-zA-Z ]+) is ((killed)|(destroyed))\!', self.message)))
-        mnames = list(filter(lambda name: 'invisible' not in name and name != 'it' and not name.startswith('poor '),
-                             mnames))
-        mnames = list(map(lambda name: name[len('saddled '):] if name.startswith('saddled ') else name,
-                          mnames))
-        mnames = list(filter(lambda name: name[0].lower() == name[0],
-                             mnames))
+        mnames = [m[-1] for m in re.findall(r'((kills?)|(destroys?)) ((an?)|(the) )?([a-zA-Z ]+)\!', self.message)]
+        mnames += [m[-4] for m in re.findall(r'((An? )|(The )( *))([a-zA-Z ]+) is ((killed)|(destroyed))\!',
+                                             self.message)]
+        mnames = [name[len('saddled '):] if name.startswith('saddled ') else name for name in mnames
+                  if 'invisible' not in name and name != 'it' and not name.startswith('poor ')]
+        mnames = [name for name in mnames if name[0].lower() == name[0]]
 
         level = self.current_level()
 
@@ -566,7 +621,7 @@ class Agent:
             old_mons = self._previous_glyphs.copy()
             old_mons[~utils.isin(self._previous_glyphs, G.MONS, G.INVISIBLE_MON)] = -1
             new_mons = self.glyphs.copy()
-            new_mons[~utils.isin(self.glyphs, G.MONS, G.INVISIBLE_MON)] = -1
+            new_mons[(self.glyph_flags & (Agent.MON_GLYPH | Agent.INVISIBLE_MON_GLYPH)) == 0] = -1
             mask = disappearance_mask(old_mons, new_mons, 1)
             mons = old_mons.copy()
             mons[~mask] = -1
@@ -594,28 +649,23 @@ class Agent:
                 old_possible_corpses[item.monster_id]
 
     def update_level(self):
-        if utils.isin(self.glyphs, G.SWALLOW).any():
+        if (self.glyph_flags & Agent.SWALLOW_GLYPH).any():
             return
 
-        if utils.any_in(self.glyphs, G.PETS):
+        if (self.glyph_flags & Agent.PET_GLYPH).any():
             self._last_pet_seen = self.blstats.time
 
         level = self.current_level()
 
-        mask = utils.isin(self.glyphs, G.FLOOR, G.STAIR_UP, G.STAIR_DOWN, G.DOOR_OPENED, G.TRAPS,
-                          G.ALTAR, G.FOUNTAIN)
-        level.walkable[mask] = True
-        level.seen[mask] = True
-        level.objects[mask] = self.glyphs[mask]
-
-        mask = utils.isin(self.glyphs, G.MONS, G.PETS, G.BODIES, G.OBJECTS, G.STATUES)
-        level.seen[mask] = True
-        level.walkable[mask & (level.objects == -1)] = True
+        walkable_mask = (self.glyph_flags & Agent.WALKABLE_GLYPH) != 0
+        occupied_mask = (self.glyph_flags & Agent.OCCUPIED_GLYPH) != 0
+        obstacle_mask = (self.glyph_flags & Agent.OBSTACLE_GLYPH) != 0
 
-        mask = utils.isin(self.glyphs, G.WALL, G.DOOR_CLOSED, G.BARS)
-        level.seen[mask] = True
-        level.objects[mask] = self.glyphs[mask]
-        level.walkable[mask] = False
+        level.seen |= walkable_mask | occupied_mask | obstacle_mask
+        level.walkable |= walkable_mask | (occupied_mask & (level.objects == -1))
+        level.walkable &= ~obstacle_mask
+        np.copyto(level.objects, self.glyphs, where=walkable_mask | obstacle_mask)
+        level.update_flags()
 
         self._update_level_items()
         self._update_level_shops()
@@ -632,6 +682,7 @@ class Agent:
                 level.seen[y, x] = True
                 level.objects[y, x] = self.glyphs[y, x]
                 level.walkable[y, x] = False  # necessary for the exit route from vaults
+        level.update_flags()
 
         # ad aerarium -- avoid valut entrance
         if self.inventory.engraving_below_me and nltk.edit_distance(self.inventory.engraving_below_me,
@@ -646,10 +697,17 @@ class Agent:
     ######## TRIVIAL HELPERS
 
     def current_level(self):
-        key = (self.blstats.dungeon_number, self.blstats.level_number)
-        if key not in self.levels:
-            self.levels[key] = Level(*key)
-        return self.levels[key]
+        if self._current_level is None:
+            key = (self.blstats.dungeon_number, self.blstats.level_number)
+            if key not in self.levels:
+                self.levels[key] = Level(*key)
+            self._current_level = self.levels[key]
+        return self._current_level
+
+    # direction names indexed by [dy + 1][dx + 1]
+    DIRECTIONS = (('nw', 'n', 'ne'),
+                  ('w', '.', 'e'),
+                  ('sw', 's', 'se'))
 
     @staticmethod
     def calc_direction(from_y, from_x, to_y, to_x, allow_nonunit_distance=False):
@@ -661,14 +719,7 @@ class Agent:
 
         assert abs(from_y - to_y) <= 1 and abs(from_x - to_x) <= 1, ((from_y, from_x), (to_y, to_x))
 
-        ret = ''
-        if to_y == from_y + 1: ret += 's'
-        if to_y == from_y - 1: ret += 'n'
-        if to_x == from_x + 1: ret += 'e'
-        if to_x == from_x - 1: ret += 'w'
-        if ret == '': ret = '.'
-
-        return ret
+        return Agent.DIRECTIONS[to_y - from_y + 1][to_x - from_x + 1]
 
     ######## TRIVIAL ACTIONS
 
@@ -829,22 +880,22 @@ class Agent:
                     self.check_terrain(force=True)
         return True
 
+    DIRECTION_ACTIONS = {
+        'n': A.CompassDirection.N, 's': A.CompassDirection.S,
+        'e': A.CompassDirection.E, 'w': A.CompassDirection.W,
+        'ne': A.CompassDirection.NE, 'se': A.CompassDirection.SE,
+        'nw': A.CompassDirection.NW, 'sw': A.CompassDirection.SW,
+        '>': A.MiscDirection.DOWN, '<': A.MiscDirection.UP,
+        '.': A.MiscDirection.WAIT,
+    }
+
     def direction(self, y, x=None):
         if x is not None:
             dir = self.calc_direction(self.blstats.y, self.blstats.x, y, x)
         else:
             dir = y
 
-        action = {
-            'n': A.CompassDirection.N, 's': A.CompassDirection.S,
-            'e': A.CompassDirection.E, 'w': A.CompassDirection.W,
-            'ne': A.CompassDirection.NE, 'se': A.CompassDirection.SE,
-            'nw': A.CompassDirection.NW, 'sw': A.CompassDirection.SW,
-            '>': A.MiscDirection.DOWN, '<': A.MiscDirection.UP,
-            '.': A.MiscDirection.WAIT,
-        }[dir]
-
-        self.step(action)
+        self.step(self.DIRECTION_ACTIONS[dir])
         return True
 
     def move(self, y, x=None):
@@ -918,22 +969,17 @@ class Agent:
 
     ######## NON-TRIVIAL HELPERS
 
+    # (dy, dx) offsets of adjacent tiles
+    NEIGHBOR_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+    NEIGHBOR_OFFSETS_NO_DIAGONAL = ((-1, 0), (0, -1), (0, 1), (1, 0))
+
     def neighbors(self, y, x, shuffle=True, diagonal=True):
-        ret = []
-        for dy in [-1, 0, 1]:
-            for dx in [-1, 0, 1]:
-                if dy == 0 and dx == 0:
-                    continue
-                if not diagonal and abs(dy) + abs(dx) > 1:
-                    continue
-                ny = y + dy
-                nx = x + dx
-                if 0 <= ny < C.SIZE_Y and 0 <= nx < C.SIZE_X:
-                    ret.append((ny, nx))
+        offsets = self.NEIGHBOR_OFFSETS if diagonal else self.NEIGHBOR_OFFSETS_NO_DIAGONAL
+        ret = [(y + dy, x + dx) for dy, dx in offsets
+               if 0 <= y + dy < C.SIZE_Y and 0 <= x + dx < C.SIZE_X]
 
         if shuffle:
             self.rng.shuffle(ret)
-            pass
 
         return ret
 
@@ -943,35 +989,38 @@ class Agent:
         if x is None:
             x = self.blstats.x
 
-        if self.last_bfs_step == self.step_count and y == self.blstats.y and x == self.blstats.x:
-            return self.last_bfs_dis.copy()
-
+        can_walk_through_traps = self._last_turn - self._allow_walking_through_traps_turn <= 50
+        cache_key = (self.step_count, can_walk_through_traps)
+        if self._bfs_cache_key != cache_key:
+            self._bfs_cache_key = cache_key
+            self._bfs_cache = {}
+            self._bfs_walkable = self._bfs_walkable_masks(can_walk_through_traps)
+
+        if (y, x) not in self._bfs_cache:
+            walkable, walkable_diagonally = self._bfs_walkable
+            self._bfs_cache[y, x] = utils.bfs(y, x,
+                                              walkable=walkable,
+                                              walkable_diagonally=walkable_diagonally,
+                                              can_squeeze=self.inventory.items.total_weight <= 600 and \
+                                                          self.current_level().dungeon_number != Level.SOKOBAN,
+                                              queue=self._bfs_queue,
+                                              )
+
+        return self._bfs_cache[y, x].copy()
+
+    def _bfs_walkable_masks(self, can_walk_through_traps):
         level = self.current_level()
 
-        walkable = level.walkable & ~utils.isin(self.glyphs, G.BOULDER) & \
+        walkable = level.walkable & \
+                   ((self.glyph_flags & (Agent.BOULDER_GLYPH | Agent.RANGED_SLOW_MON_GLYPH)) == 0) & \
                    ~self.monster_tracker.peaceful_monster_mask & \
                    ~level.forbidden
 
-        if self._last_turn - self._allow_walking_through_traps_turn > 50:
-            walkable &= ~utils.isin(level.objects, G.TRAPS)
+        if not can_walk_through_traps:
+            walkable &= (level.flags & Level.TRAP) == 0
 
-        for my, mx in list(zip(*np.nonzero(utils.isin(self.glyphs, G.MONS)))):
-            mon = MON.permonst(self.glyphs[my][mx])
-            if mon.mname in combat.monster_utils.ONLY_RANGED_SLOW_MONSTERS:
-                walkable[my, mx] = False
-
-        dis = utils.bfs(y, x,
-                        walkable=walkable,
-                        walkable_diagonally=walkable & ~utils.isin(level.objects, G.DOORS) & (level.objects != -1),
-                        can_squeeze=self.inventory.items.total_weight <= 600 and \
-                                    self.current_level().dungeon_number != Level.SOKOBAN,
-                        )
-
-        if y == self.blstats.y and x == self.blstats.x:
-            self.last_bfs_dis = dis
-            self.last_bfs_step = self.step_count
-
-        return dis.copy()
+        walkable_diagonally = walkable & ((level.flags & (Level.KNOWN | Level.DOOR)) == Level.KNOWN)
+        return walkable, walkable_diagonally
 
     def path(self, from_y, from_x, to_y, to_x, dis=None):
         if from_y == to_y and from_x == to_x:
@@ -986,6 +1035,28 @@ class Agent:
         #        The path is the shortest possible, so the agent is guaranteed to
         #        unstuck itself eventually (usually a few panic exceptions) if that happens
 
+        # random neighbor order in each step back, so that ties between shortest paths are broken randomly.
+        # The permutations consume the RNG exactly like shuffling `neighbors` of a tile that is not on the border
+        rng_state = self.rng.get_state()
+        n = dis[to_y, to_x]
+        orders = np.empty((n, len(self.NEIGHBOR_OFFSETS)), dtype=np.int64)
+        for i in range(n - 1, -1, -1):
+            orders[i] = self.rng.permutation(len(self.NEIGHBOR_OFFSETS))
+        path = utils.path_from_dis(dis, to_y, to_x, orders)
+        assert len(path), 'no path found in the BFS distances'
+
+        steps = path[1:]
+        if not ((steps[:, 0] > 0) & (steps[:, 0] < C.SIZE_Y - 1) &
+                (steps[:, 1] > 0) & (steps[:, 1] < C.SIZE_X - 1)).all():
+            # border tiles have fewer neighbors to shuffle, redo it step by step to keep the same RNG consumption
+            self.rng.set_state(rng_state)
+            return self._path_slow(from_y, from_x, to_y, to_x, dis)
+
+        path = list(map(tuple, path.tolist()))
+        assert path[0] == (from_y, from_x) and path[-1] == (to_y, to_x)
+        return path
+
+    def _path_slow(self, from_y, from_x, to_y, to_x, dis):
         cur_y, cur_x = to_y, to_x
         path_rev = [(cur_y, cur_x)]
         while cur_y != from_y or cur_x != from_x:
@@ -998,9 +1069,7 @@ class Agent:
                 assert 0
 
         assert dis[cur_y, cur_x] == 0 and from_y == cur_y and from_x == cur_x
-        path = path_rev[::-1]
-        assert path[0] == (from_y, from_x) and path[-1] == (to_y, to_x)
-        return path
+        return path_rev[::-1]
 
     ######## NON-TRIVIAL ACTIONS
 
@@ -1086,20 +1155,21 @@ class Agent:
             return []
 
         dis = self.bfs()
+        # only monsters next to a reachable tile
+        mask &= utils.dilate(dis != -1, radius=1)
         ret = []
         for y, x in zip(*mask.nonzero()):
-            if (dis[max(y - 1, 0):y + 2, max(x - 1, 0):x + 2] != -1).any():
-                if self.glyphs[y, x] == nh.GLYPH_INVISIBLE or \
-                        not MON.is_monster(self.glyphs[y, x]):  # TODO: some ghost are not visible in glyphs (?)
-                    if utils.adjacent((self.blstats.y, self.blstats.x), (y, x)):
-                        class dummy_permonst:
-                            mname = 'unknown'
-                            mlet = '0'
-                            mmove = 12
-
-                        ret.append((dis[y][x], y, x, dummy_permonst(), self.glyphs[y][x]))
-                else:
-                    ret.append((dis[y][x], y, x, MON.permonst(self.glyphs[y][x]), self.glyphs[y][x]))
+            if self.glyphs[y, x] == nh.GLYPH_INVISIBLE or \
+                    not MON.is_monster(self.glyphs[y, x]):  # TODO: some ghost are not visible in glyphs (?)
+                if utils.adjacent((self.blstats.y, self.blstats.x), (y, x)):
+                    class dummy_permonst:
+                        mname = 'unknown'
+                        mlet = '0'
+                        mmove = 12
+
+                    ret.append((dis[y][x], y, x, dummy_permonst(), self.glyphs[y][x]))
+            else:
+                ret.append((dis[y][x], y, x, MON.permonst(self.glyphs[y][x]), self.glyphs[y][x]))
         ret.sort()
         return ret
 
@@ -1240,11 +1310,11 @@ class Agent:
     @utils.debug_log('engulfed_fight')
     @Strategy.wrap
     def engulfed_fight(self):
-        if not utils.any_in(self.glyphs, G.SWALLOW):
+        if not (self.glyph_flags & Agent.SWALLOW_GLYPH).any():
             yield False
         yield True
         while True:
-            mask = utils.isin(self.glyphs, G.SWALLOW)
+            mask = (self.glyph_flags & Agent.SWALLOW_GLYPH) != 0
             if not mask.any():
                 break
             assert self.melee_attack(*list(zip(*mask.nonzero()))[0])
@@ -1565,3 +1635,18 @@ class Agent:
                     self.handle_exception(e)
         except AgentFinished:
             pass
+
+
+_GLYPH_FLAGS_LUT = (glyph_lut(G.FLOOR, G.STAIR_UP, G.STAIR_DOWN, G.DOOR_OPENED, G.TRAPS, G.ALTAR,
+                              G.FOUNTAIN) * Agent.WALKABLE_GLYPH |
+                    glyph_lut(G.MONS, G.PETS, G.BODIES, G.OBJECTS, G.STATUES) * Agent.OCCUPIED_GLYPH |
+                    glyph_lut(G.WALL, G.DOOR_CLOSED, G.BARS) * Agent.OBSTACLE_GLYPH |
+                    glyph_lut(G.MONS) * Agent.MON_GLYPH | glyph_lut(G.PETS) * Agent.PET_GLYPH |
+                    glyph_lut(G.INVISIBLE_MON) * Agent.INVISIBLE_MON_GLYPH |
+                    glyph_lut(G.SWALLOW) * Agent.SWALLOW_GLYPH | glyph_lut(G.BOULDER) * Agent.BOULDER_GLYPH |
+                    glyph_lut(G.STONE) * Agent.STONE_GLYPH | glyph_lut(G.DOOR_CLOSED) * Agent.DOOR_CLOSED_GLYPH |
+                    glyph_lut(G.SHOPKEEPER) * Agent.SHOPKEEPER_GLYPH |
+                    glyph_lut(G.OBJECTS, G.BODIES, G.STATUES) * Agent.OBJECT_GLYPH |
+                    glyph_lut(G.VISIBLE_FLOOR) * Agent.VISIBLE_FLOOR_GLYPH |
+                    glyph_lut(_ONLY_RANGED_SLOW_MONSTERS) * Agent.RANGED_SLOW_MON_GLYPH |
+                    glyph_lut(G.ORACLE) * Agent.ORACLE_GLYPH | glyph_lut(G.GUARD) * Agent.GUARD_GLYPH).astype(np.uint16)
@@ -46,7 +46,7 @@ def fight2_semantic_maps(agent):
     y1, y2, x1, x2 = agent.blstats.y - radius_y, agent.blstats.y + radius_y + 1, \
                      agent.blstats.x - radius_x, agent.blstats.x + radius_x + 1
     level = agent.current_level()
-    walkable = level.walkable & ~utils.isin(agent.glyphs, G.BOULDER) & \
+    walkable = level.walkable & ((agent.glyph_flags & agent.BOULDER_GLYPH) == 0) & \
                ~agent.monster_tracker.peaceful_monster_mask & \
                ~utils.isin(level.objects, G.TRAPS)
 
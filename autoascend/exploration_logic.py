@@ -111,9 +111,9 @@ class ExplorationLogic:
         go_to_strategy(y, x).run()
         assert (self.agent.blstats.y, self.agent.blstats.x) == (y, x)
         while self.agent.has_pet:
-            if utils.any_in(self.agent.glyphs[max(self.agent.blstats.y - 1, 0) : self.agent.blstats.y + 2,
-                                              max(self.agent.blstats.x - 1, 0) : self.agent.blstats.x + 2],
-                            G.PETS):
+            if (self.agent.glyph_flags[max(self.agent.blstats.y - 1, 0) : self.agent.blstats.y + 2,
+                                       max(self.agent.blstats.x - 1, 0) : self.agent.blstats.x + 2] &
+                    self.agent.PET_GLYPH).any():
                 break
             self.agent.move('.')
         self.agent.move(dir)
@@ -127,9 +127,9 @@ class ExplorationLogic:
             go_to_strategy(y, x).run()
             assert (self.agent.blstats.y, self.agent.blstats.x) == (y, x)
             while self.agent.has_pet:
-                if utils.any_in(self.agent.glyphs[max(self.agent.blstats.y - 1, 0) : self.agent.blstats.y + 2,
-                                                max(self.agent.blstats.x - 1, 0) : self.agent.blstats.x + 2],
-                                G.PETS):
+                if (self.agent.glyph_flags[max(self.agent.blstats.y - 1, 0) : self.agent.blstats.y + 2,
+                                           max(self.agent.blstats.x - 1, 0) : self.agent.blstats.x + 2] &
+                        self.agent.PET_GLYPH).any():
                     break
                 self.agent.move('.')
             self.agent.move(dir)
@@ -295,20 +295,14 @@ class ExplorationLogic:
         def to_visit_func():
             level = self.agent.current_level()
 
-            stone = ~level.seen & utils.isin(self.agent.glyphs, G.STONE)
-            doors = utils.isin(self.agent.glyphs, G.DOOR_CLOSED) & (level.door_open_count < door_open_count)
+            stone = ~level.seen & ((self.agent.glyph_flags & self.agent.STONE_GLYPH) != 0)
+            doors = ((self.agent.glyph_flags & self.agent.DOOR_CLOSED_GLYPH) != 0) & \
+                    (level.door_open_count < door_open_count)
             if not stone.any() and not doors.any():
                 return stone
 
-            to_visit = np.zeros((C.SIZE_Y, C.SIZE_X), dtype=bool)
-            tmp = np.zeros((C.SIZE_Y, C.SIZE_X), dtype=bool)
-            for dy in [-1, 0, 1]:
-                for dx in [-1, 0, 1]:
-                    if dy != 0 or dx != 0:
-                        to_visit |= utils.translate(stone, dy, dx, out=tmp)
-                        if dx == 0 or dy == 0:
-                            to_visit |= utils.translate(doors, dy, dx, out=tmp)
-            return to_visit
+            # stone and closed door tiles themselves are never reachable, so there is no need to exclude them
+            return utils.dilate(stone, radius=1) | utils.dilate(doors, radius=1, with_diagonal=False)
 
         def to_search_func(prio_limit=0, return_prio=False):
             level = self.agent.current_level()
@@ -333,21 +327,13 @@ class ExplorationLogic:
                     self.agent._allow_attack_all_turn = self.agent._last_turn
 
             # is_on_corridor = utils.isin(level.objects, G.CORRIDOR)
-            is_on_door = utils.isin(level.objects, G.DOORS)
+            is_on_door = (level.flags & Level.DOOR) != 0
 
-            stones = np.zeros((C.SIZE_Y, C.SIZE_X), np.int32)
-            walls = np.zeros((C.SIZE_Y, C.SIZE_X), np.int32)
-
-            tmp = np.zeros((C.SIZE_Y, C.SIZE_X), dtype=self.agent.glyphs.dtype)
-            for dy in [-1, 0, 1]:
-                for dx in [-1, 0, 1]:
-                    if dy != 0 or dx != 0:
-                        stones += utils.isin(utils.translate(level.objects, dy, dx, out=tmp), G.STONE)
-                        walls += utils.isin(utils.translate(level.objects, dy, dx, out=tmp), G.WALL)
+            stones = utils.count_neighbors((level.flags & Level.STONE) != 0)
+            walls = utils.count_neighbors((level.flags & Level.WALL) != 0)
 
             prio += (is_on_door & (stones > 3)) * 250
-            prio += (np.stack([utils.translate(level.walkable, y, x, out=tmp).astype(np.int32)
-                               for y, x in [(1, 0), (-1, 0), (0, 1), (0, -1)]]).sum(0) <= 1) * 250
+            prio += (utils.count_neighbors(level.walkable, with_diagonal=False) <= 1) * 250
             prio[(stones == 0) & (walls == 0)] = -np.inf
 
             prio[~level.walkable | (dis == -1)] = -np.inf
@@ -386,14 +372,10 @@ class ExplorationLogic:
                 dis = self.agent.bfs()
                 to_explore = (to_visit | to_search) & (dis != -1)
 
-                dynamic_search_fallback = False
-                if not to_explore.any():
-                    dynamic_search_fallback = True
-                else:
-                    # find all closest to_explore tiles
+                dynamic_search_fallback = not to_explore.any()
+                if not dynamic_search_fallback:
+                    # find all closest to_explore tiles (to_explore excludes unreachable ones, so it's never empty)
                     nonzero_y, nonzero_x = ((dis == dis[to_explore].min()) & to_explore).nonzero()
-                    if len(nonzero_y) == 0:
-                        dynamic_search_fallback = True
 
                 if dynamic_search_fallback:
                     if search_prio_limit is not None and search_prio_limit >= 0:
@@ -165,14 +165,14 @@ class GlobalLogic:
 
     def update(self):
         if not self.agent.character.prop.hallu:
-            if utils.isin(self.agent.glyphs, G.ORACLE).any():
+            if (self.agent.glyph_flags & self.agent.ORACLE_GLYPH).any():
                 if self.oracle_level is None:
                     self.oracle_level = self.agent.current_level().key()
                 else:
                     assert self.oracle_level == self.agent.current_level().key()
 
             if self.agent.current_level().dungeon_number == Level.GNOMISH_MINES and \
-                    utils.isin(self.agent.glyphs, G.SHOPKEEPER).any():
+                    (self.agent.glyph_flags & self.agent.SHOPKEEPER_GLYPH).any():
                 if self.minetown_level is None:
                     self.minetown_level = self.agent.current_level().key()
                 else:
@@ -238,7 +238,7 @@ class GlobalLogic:
             possible_mimics = set()
             last_resort_move = None
             for (y, x), (dy, dx) in answer:
-                boulder_map = utils.isin(self.agent.glyphs, G.BOULDER)
+                boulder_map = (self.agent.glyph_flags & self.agent.BOULDER_GLYPH) != 0
                 mask = boulder_map[offset[0] : offset[0] + sokomap.sokomap.shape[0],
                                    offset[1] : offset[1] + sokomap.sokomap.shape[1]]
                 ty, tx = offset[0] + y - dy, offset[1] + x - dx,
@@ -265,7 +265,7 @@ class GlobalLogic:
 
                                 def clear_neighbors():
                                     to_visit_mask[self.agent.blstats.y, self.agent.blstats.x] = 0
-                                    to_visit_mask[utils.isin(self.agent.glyphs, G.VISIBLE_FLOOR)] = 0
+                                    to_visit_mask[(self.agent.glyph_flags & self.agent.VISIBLE_FLOOR_GLYPH) != 0] = 0
                                     return not to_visit_mask[vy, vx]
 
                                 self.agent.go_to(vy, vx, callback=clear_neighbors)
@@ -488,7 +488,7 @@ class GlobalLogic:
     @utils.debug_log('follow_guard')
     @Strategy.wrap
     def follow_guard(self):
-        if not utils.isin(self.agent.glyphs, G.GUARD).any():
+        if not (self.agent.glyph_flags & self.agent.GUARD_GLYPH).any():
             yield False
 
         if any(item.category == nh.COIN_CLASS for item in flatten_items(self.agent.inventory.items)):
@@ -499,7 +499,7 @@ class GlobalLogic:
             self.agent.inventory.arrange_items().run()
             return
 
-        ys, xs = utils.isin(self.agent.glyphs, G.GUARD).nonzero()
+        ys, xs = ((self.agent.glyph_flags & self.agent.GUARD_GLYPH) != 0).nonzero()
         y, x = ys[0], xs[0]
 
         if utils.adjacent((y, x), (self.agent.blstats.y, self.agent.blstats.x)):
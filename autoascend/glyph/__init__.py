@@ -1,9 +1,21 @@
 import nle.nethack as nh
+import numpy as np
 
 from . import monster as MON
 from . import screen_symbols as SS
 
 
+def glyph_lut(*glyph_sets):
+    """ Returns boolean lookup table indexed by glyph, i.e. `np.take(glyph_lut(G.WALL), glyphs)` is equivalent
+    to `utils.isin(glyphs, G.WALL)`. The table has one additional (False) entry at the end, so that -1
+    (unknown tile in `Level.objects`) is never matched.
+    """
+    lut = np.zeros(nh.MAX_GLYPH + 1, dtype=bool)
+    for glyph_set in glyph_sets:
+        lut[list(glyph_set)] = True
+    return lut
+
+
 class WEA:
     @staticmethod
     def expected_damage(damage_str):
@@ -108,11 +120,15 @@ class G:  # Glyphs
 
     @classmethod
     def assert_map(cls, glyphs, chars):
-        for glyph, char in zip(glyphs.reshape(-1), chars.reshape(-1)):
-            char = bytes([char]).decode()
-            for k, v in cls.__annotations__.items():
-                assert glyph not in cls.DICT[k] or char in v, f'{k} {v} {glyph} {char}'
+        for k, v in cls.__annotations__.items():
+            lut, valid_chars = cls.ANNOTATION_LUTS[k]
+            wrong = np.take(lut, glyphs) & ~np.isin(chars, valid_chars)
+            if wrong.any():
+                glyph, char = glyphs[wrong][0], chr(chars[wrong][0])
+                assert 0, f'{k} {v} {glyph} {char}'
 
 
 G.INV_DICT = {i: [k for k, v in G.DICT.items() if i in v]
               for i in set.union(*map(set, G.DICT.values()))}
+# {annotated glyph class -> (glyph lookup table, allowed chars)}, used by `G.assert_map`
+G.ANNOTATION_LUTS = {k: (glyph_lut(G.DICT[k]), np.array([ord(c) for c in v])) for k, v in G.__annotations__.items()}
@@ -1207,7 +1207,7 @@ class Inventory:
     @utils.debug_log('inventory.check_items')
     @Strategy.wrap
     def check_items(self):
-        mask = utils.isin(self.agent.glyphs, G.OBJECTS, G.BODIES, G.STATUES)
+        mask = (self.agent.glyph_flags & self.agent.OBJECT_GLYPH) != 0
         if not mask.any():
             yield False
 
@@ -1,9 +1,10 @@
 from collections import defaultdict
 
+import nle.nethack as nh
 import numpy as np
 
 from . import utils
-from .glyph import C, G, SHOP, SS
+from .glyph import C, G, SHOP, SS, glyph_lut
 
 
 class Level:
@@ -16,6 +17,15 @@ class Level:
 
     dungeon_names = {v: k for k, v in locals().items() if not k.startswith('_')}
 
+    # bits of `Level.flags`
+    KNOWN = 1
+    DOOR = 2
+    TRAP = 4
+    WALL = 8
+    STONE = 16
+    STAIR_DOWN = 32
+    STAIR_UP = 64
+
     def __init__(self, dungeon_number, level_number):
         self.dungeon_number = dungeon_number
         self.level_number = level_number
@@ -24,6 +34,8 @@ class Level:
         self.seen = np.zeros((C.SIZE_Y, C.SIZE_X), bool)
         self.objects = np.zeros((C.SIZE_Y, C.SIZE_X), np.int16)
         self.objects[:] = -1
+        # per-tile classification of `objects` packed into bits, see `update_flags`
+        self.flags = np.zeros((C.SIZE_Y, C.SIZE_X), np.uint8)
         self.was_on = np.zeros((C.SIZE_Y, C.SIZE_X), bool)
 
         self.shop = np.zeros((C.SIZE_Y, C.SIZE_X), bool)
@@ -46,6 +58,9 @@ class Level:
         # e.g. ad aerarium -- avoid valut entrance
         self.forbidden = np.zeros((C.SIZE_Y, C.SIZE_X), bool)
 
+    def update_flags(self):
+        np.take(_FLAGS_LUT, self.objects, out=self.flags)
+
     def key(self):
         return (self.dungeon_number, self.level_number)
 
@@ -54,13 +69,18 @@ class Level:
         if all:
             down = up = portal = True
         assert down or up or portal
-        elems = []
+        bits = 0
         if down:
-            elems.append(G.STAIR_DOWN)
+            bits |= Level.STAIR_DOWN
         if up:
-            elems.append(G.STAIR_UP)
-        mask = utils.isin(self.objects, *elems)
-        return {(y, x): self.stair_destination.get((y, x), None) for y, x in zip(*mask.nonzero())}
+            bits |= Level.STAIR_UP
+        return {(y, x): self.stair_destination.get((y, x), None) for y, x in np.argwhere(self.flags & bits)}
 
     def is_light_level(self):
         return np.sum(utils.isin(self.objects, [SS.S_room, SS.S_litcorr])) > 15
+
+
+_FLAGS_LUT = (glyph_lut(range(nh.MAX_GLYPH)) * Level.KNOWN | glyph_lut(G.DOORS) * Level.DOOR |
+              glyph_lut(G.TRAPS) * Level.TRAP | glyph_lut(G.WALL) * Level.WALL |
+              glyph_lut(G.STONE) * Level.STONE | glyph_lut(G.STAIR_DOWN) * Level.STAIR_DOWN |
+              glyph_lut(G.STAIR_UP) * Level.STAIR_UP).astype(np.uint8)
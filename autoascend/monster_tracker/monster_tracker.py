@@ -4,9 +4,8 @@ import numpy as np
 from nle.nethack import actions as A
 
 from .kernels import figure_out_monster_movement
-from .. import utils
 from ..exceptions import AgentPanic
-from ..glyph import C, G
+from ..glyph import C
 
 
 class MonsterTracker:
@@ -20,7 +19,7 @@ class MonsterTracker:
         self.monster_mask = np.zeros((C.SIZE_Y, C.SIZE_X), bool)
 
     def take_all_monsters(self):
-        if utils.any_in(self.agent.glyphs, G.SWALLOW):
+        if (self.agent.glyph_flags & self.agent.SWALLOW_GLYPH).any():
             return {}
         with self.agent.atom_operation():
             self.agent.step(A.Command.WHATIS, iter(['M']))
@@ -46,9 +45,10 @@ class MonsterTracker:
         return monsters
 
     def _get_current_masks(self):
-        new_monster_mask = utils.isin(self.agent.glyphs, G.MONS, G.INVISIBLE_MON)
+        flags = self.agent.glyph_flags
+        new_monster_mask = (flags & (self.agent.MON_GLYPH | self.agent.INVISIBLE_MON_GLYPH)) != 0
         new_monster_mask[self.agent.blstats.y, self.agent.blstats.x] = 0
-        pet_mask = utils.isin(self.agent.glyphs, G.PETS)
+        pet_mask = (flags & self.agent.PET_GLYPH) != 0
 
         return new_monster_mask, pet_mask
 
@@ -13,36 +13,81 @@ import toolz
 from .strategy import Strategy
 
 
-@nb.njit(cache=True)
-def bfs(y, x, *, walkable, walkable_diagonally, can_squeeze):
-    dis = np.zeros(walkable.shape, dtype=np.int32)
+def bfs(y, x, *, walkable, walkable_diagonally, can_squeeze, queue=None):
+    """ `queue` is an optional (2, H * W) int32 scratch buffer, that can be reused between calls """
+    if queue is None:
+        queue = np.empty((2, walkable.shape[0] * walkable.shape[1]), dtype=np.int32)
+    # the kernel isn't bounds checked
+    assert queue.shape == (2, walkable.shape[0] * walkable.shape[1]), (queue.shape, walkable.shape)
+    return _bfs_kernel(y, x, np.ascontiguousarray(walkable), np.ascontiguousarray(walkable_diagonally),
+                       can_squeeze, queue)
+
+
+# compiled eagerly for C-contiguous arrays only, so the index arithmetic doesn't depend on runtime strides
+@nb.njit('i4[:,::1](i8,i8,b1[:,::1],b1[:,::1],b1,i4[:,::1])', cache=True)
+def _bfs_kernel(y, x, walkable, walkable_diagonally, can_squeeze, queue):
+    h, w = walkable.shape
+    dis = np.zeros((h, w), dtype=np.int32)
     dis[:] = -1
     dis[y, x] = 0
 
-    buf = np.zeros((walkable.shape[0] * walkable.shape[1], 2), dtype=np.uint32)
-    index = 0
-    buf[index] = (y, x)
-    size = 1
-    while index < size:
-        y, x = buf[index]
-        index += 1
-
-        for dy in [-1, 0, 1]:
-            for dx in [-1, 0, 1]:
-                py, px = y + dy, x + dx
-                if 0 <= py < walkable.shape[0] and 0 <= px < walkable.shape[1] and (dy != 0 or dx != 0):
-                    if (walkable[py, px] and
-                            (abs(dy) + abs(dx) <= 1 or
-                             (walkable_diagonally[py, px] and walkable_diagonally[y, x] and
-                              (can_squeeze or walkable[py, x] or walkable[y, px])))):
-                        if dis[py, px] == -1:
-                            dis[py, px] = dis[y, x] + 1
-                            buf[size] = (py, px)
-                            size += 1
+    queue_y = queue[0]
+    queue_x = queue[1]
+    queue_y[0], queue_x[0] = y, x
+    head = 0
+    tail = 1
+    while head < tail:
+        y, x = queue_y[head], queue_x[head]
+        head += 1
+        d = dis[y, x] + 1
+
+        for dy in range(-1, 2):
+            py = y + dy
+            if py < 0 or py >= h:
+                continue
+            for dx in range(-1, 2):
+                px = x + dx
+                if px < 0 or px >= w or (dy == 0 and dx == 0):
+                    continue
+                if dis[py, px] != -1 or not walkable[py, px]:
+                    continue
+                if dy != 0 and dx != 0 and \
+                        not (walkable_diagonally[py, px] and walkable_diagonally[y, x] and
+                             (can_squeeze or walkable[py, x] or walkable[y, px])):
+                    continue
+                dis[py, px] = d
+                queue_y[tail], queue_x[tail] = py, px
+                tail += 1
 
     return dis
 
 
+@nb.njit(cache=True)
+def path_from_dis(dis, to_y, to_x, orders):
+    """ Follows decreasing `dis` (as returned by `bfs`) from (to_y, to_x) back to the start tile.
+    `orders[i]` is the order in which neighbors are checked in the i-th step back, i.e. it decides ties.
+    Returns (dis[to_y, to_x] + 1, 2) array of positions from the start to the target, or empty array if
+    `dis` is inconsistent.
+    """
+    offsets = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+    n = dis[to_y, to_x]
+    ret = np.empty((n + 1, 2), dtype=np.int32)
+    y, x = to_y, to_x
+    ret[n, 0], ret[n, 1] = y, x
+    for i in range(n - 1, -1, -1):
+        found = False
+        for k in orders[i]:
+            py, px = y + offsets[k][0], x + offsets[k][1]
+            if 0 <= py < dis.shape[0] and 0 <= px < dis.shape[1] and dis[py, px] == i:
+                found = True
+                break
+        if not found:
+            return ret[:0]
+        y, x = py, px
+        ret[i, 0], ret[i, 1] = y, x
+    return ret
+
+
 def translate(array, y_offset, x_offset, out=None):
     if out is None:
         out = np.zeros_like(array)
@@ -111,11 +156,6 @@ def isin(array, *elems):
     return _isin_kernel(array, mi, ma, mask)
 
 
-def any_in(array, *elems):
-    # TODO: optimize
-    return isin(array, *elems).any()
-
-
 @toolz.curry
 def debug_log(txt, fun, color=(255, 255, 255)):
     @wraps(fun)
@@ -183,6 +223,15 @@ def dilate(mask, radius=1, with_diagonal=True):
     return cv2.dilate(mask.astype(np.uint8), kernel).astype(bool)
 
 
+def count_neighbors(mask, with_diagonal=True):
+    """ Returns number of True tiles adjacent to each tile (out of the array counts as False) """
+    kernel = np.ones((3, 3), dtype=np.float32)
+    if not with_diagonal:
+        kernel[::2, ::2] = 0
+    kernel[1, 1] = 0
+    return cv2.filter2D(mask.astype(np.uint8), -1, kernel, borderType=cv2.BORDER_CONSTANT).astype(np.int32)
+
+
 def slice_with_padding(array, a1, a2, b1, b2, pad_value=0):
     ret = np.zeros_like(array, shape=(a2 - a1, b2 - b1)) + pad_value
     off_a1 = -a1 if a1 < 0 else 0
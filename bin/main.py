@@ -242,8 +242,11 @@ def run_simulations(args):
     @ray.remote(num_gpus=1 / 4 if args.with_gpu else 0)
     def remote_simulation(args, seed_offset, timeout=500):
         # I think there is some nondeterminism in nle environment when playing
-        # multiple episodes (maybe bones?). That should do the trick
-        q = Queue()
+        # multiple episodes (maybe bones?). That should do the trick.
+        # Ray workers are already a persistent pool, so only a cheap fork of the worker (with everything
+        # imported and jit-compiled) is paid per episode. Forking is also required to run the `sim` closure.
+        ctx = multiprocessing.get_context('fork')
+        q = ctx.Queue()
 
         if args.output_video_dir is not None:
             timeout = 4 * 24 * 60 * 60
@@ -252,7 +255,7 @@ def run_simulations(args):
             q.put(single_simulation(args, seed_offset, timeout=timeout))
 
         try:
-            p = Process(target=sim, daemon=False)
+            p = ctx.Process(target=sim, daemon=False)
             p.start()
             return q.get()
         finally: